@@ -93,7 +93,14 @@ ccm start --wait-for-binary-proto
 pushd ${CASSANDRA_DIR}/pylib/cqlshlib/ >/dev/null
 
 set +e # disable immediate exit from this point
-pytest --junitxml=${BUILD_DIR}/test/output/cqlshlib.xml
+# the completion and output tests are dominated by waiting on cqlsh subprocesses, so they can be spread
+# across pytest-xdist workers by setting CQLSH_TEST_WORKERS. they run serially by default, since the
+# completion tests that list every keyspace on the cluster are skipped when run across several workers.
+PYTEST_XDIST_OPTS=""
+if [ "x${CQLSH_TEST_WORKERS}" != "x" ] && [ "${CQLSH_TEST_WORKERS}" != "1" ]; then
+    PYTEST_XDIST_OPTS="-n ${CQLSH_TEST_WORKERS}"
+fi
+pytest ${PYTEST_XDIST_OPTS} --junitxml=${BUILD_DIR}/test/output/cqlshlib.xml
 RETURN="$?"
 
 # remove <testsuites> wrapping elements. `ant generate-unified-test-report` doesn't like it`
@@ -0,0 +1,112 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A character trie for looking up completion candidates by prefix"""
+
+import re
+
+# marks a node at which a whole word ends. no character is the empty string,
+# so this can't collide with a child node's key
+WORD_END = ''
+
+
+class Trie:
+    """
+    Set of words stored as nested dicts keyed by character, so that the words
+    sharing a prefix can be found by walking the prefix once rather than by
+    testing every word.
+    """
+
+    def __init__(self, words=()):
+        self.root = {}
+        for word in words:
+            self.insert(word)
+
+    def insert(self, word):
+        node = self.root
+        for char in word:
+            node = node.setdefault(char, {})
+        node[WORD_END] = True
+
+    def _find(self, prefix):
+        node = self.root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return None
+        return node
+
+    def __contains__(self, word):
+        node = self._find(word)
+        return node is not None and WORD_END in node
+
+    def __iter__(self):
+        return iter(self.children(''))
+
+    def longest_prefix(self, s):
+        """
+        Return the longest word in the trie which is a prefix of s, or None if
+        there is no such word.
+        """
+        node = self.root
+        found = '' if WORD_END in node else None
+        for i, char in enumerate(s):
+            node = node.get(char)
+            if node is None:
+                break
+            if WORD_END in node:
+                found = s[:i + 1]
+        return found
+
+    def children(self, prefix):
+        """
+        Return the set of all words in the trie which start with prefix.
+        """
+        words = set()
+        node = self._find(prefix)
+        if node is None:
+            return words
+        pending = [(prefix, node)]
+        while pending:
+            sofar, node = pending.pop()
+            for char, child in node.items():
+                if char == WORD_END:
+                    words.add(sofar)
+                else:
+                    pending.append((sofar + char, child))
+        return words
+
+    def pattern(self):
+        """
+        Return a regular expression matching exactly the words in the trie,
+        with common prefixes factored out, e.g. 'a(?:dd|ll(?:ow)?)' for the
+        words 'add', 'all' and 'allow'. Unlike a plain alternation of the
+        words, matching it never tries the same prefix twice.
+        """
+        if not self.root:
+            return '(?!)'  # matches nothing
+        return self._node_pattern(self.root)
+
+    @classmethod
+    def _node_pattern(cls, node):
+        branches = [re.escape(char) + cls._node_pattern(child)
+                    for char, child in sorted(node.items()) if char != WORD_END]
+        if not branches:
+            return ''
+        if len(branches) == 1 and WORD_END not in node:
+            return branches[0]
+        group = '(?:' + '|'.join(branches) + ')'
+        return group + '?' if WORD_END in node else group
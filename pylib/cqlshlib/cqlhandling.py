@@ -21,6 +21,7 @@ import traceback
 
 import cassandra
 from cqlshlib import pylexotron, util
+from cqlshlib.completion_trie import Trie
 
 Hint = pylexotron.Hint
 
@@ -71,7 +72,7 @@ class CqlParsingRuleSet(pylexotron.ParsingRuleSet):
         problems with completion, see CASSANDRA-10415
         """
         cassandra.metadata.cql_keywords_reserved = cql_keywords_reserved
-        syntax = '<reserved_identifier> ::= /(' + '|'.join(r'\b{}\b'.format(k) for k in cql_keywords_reserved) + ')/ ;'
+        syntax = r'<reserved_identifier> ::= /\b' + Trie(cql_keywords_reserved).pattern() + r'\b/ ;'
         self.append_rules(syntax)
 
     def completer_for(self, rulename, symname):
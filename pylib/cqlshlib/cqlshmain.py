@@ -458,6 +458,11 @@ class Shell(cmd.Cmd):
         }
         self.connection_versions = vers
 
+    # the schema lookups below, used by tab completion, read the driver's
+    # in-memory schema metadata. the driver refreshes it from schema change
+    # events, so these make no round trips to the cluster and need no caching
+    # of their own; a cache here would only risk going stale after DDL.
+
     def get_keyspace_names(self):
         return list(self.conn.metadata.keyspaces)
 
@@ -57,8 +57,13 @@ _used_ks_names = set()
 
 
 def make_ks_name():
+    # under pytest-xdist, tag the name with the worker id ('gw0', 'gw1', ...)
+    # so each worker's keyspaces are told apart on the shared cluster
+    worker = os.environ.get('PYTEST_XDIST_WORKER')
+    ks_prefix = 'cqlshtests_' + (worker + '_' if worker else '')
+
     def random_ks():
-        return 'cqlshtests_' + ''.join(random.choice(string.ascii_lowercase) for _ in range(10))
+        return ks_prefix + ''.join(random.choice(string.ascii_lowercase) for _ in range(10))
 
     s = random_ks()
     while s in _used_ks_names:
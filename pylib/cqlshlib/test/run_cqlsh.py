@@ -20,6 +20,7 @@ import os
 import sys
 import re
 import contextlib
+import select
 import subprocess
 import signal
 from time import time
@@ -204,22 +205,36 @@ class ProcRunner:
                 lines.append(self.read_until('\n', blksize=blksize))
         return lines
 
-    def read_up_to_timeout(self, timeout, blksize=4096):
+    def output_ready(self, timeout):
+        """
+        Wait up to 'timeout' seconds for the subprocess to have output waiting
+        to be read, and return whether it does.
+        """
+        fd = self.childpty if self.tty else self.proc.stdout.fileno()
+        readable, _, _ = select.select([fd], [], [], timeout)
+        return bool(readable)
+
+    def read_until_quiet(self, quiet, timeout, blksize=4096, after=0):
+        """
+        Read output until the subprocess has written nothing for 'quiet'
+        seconds, or until 'timeout' seconds have passed altogether. The quiet
+        period only counts once more than 'after' characters have been read
+        (e.g. past the echo of text just sent); until then, the whole timeout
+        is allowed.
+        """
         got = self.readbuf
         self.readbuf = ''
-        curtime = time()
-        stoptime = curtime + timeout
-        while curtime < stoptime:
-            try:
-                with timing_out(stoptime - curtime):
-                    stuff = self.read(blksize)
-            except TimeoutError:
+        stoptime = time() + timeout
+        while True:
+            remaining = stoptime - time()
+            wait = min(quiet, remaining) if len(got) > after else remaining
+            if remaining <= 0 or not self.output_ready(wait):
                 break
+            stuff = self.read(blksize)
             cqlshlog.debug("read %r from subproc" % (stuff,))
             if stuff == '':
                 break
             got += stuff
-            curtime = time()
         return got
 
 
@@ -259,8 +274,12 @@ class CqlshRunner(ProcRunner):
     def read_to_next_prompt(self, timeout=10.0):
         return self.read_until(self.prompt, timeout=timeout, ptty_timeout=3, replace=[DEFAULT_SMM_SEQUENCE])
 
-    def read_up_to_timeout(self, timeout, blksize=4096):
-        output = ProcRunner.read_up_to_timeout(self, timeout, blksize=blksize)
+    def read_until_quiet(self, quiet, timeout, blksize=4096, after=0):
+        output = ProcRunner.read_until_quiet(self, quiet, timeout, blksize=blksize, after=after)
+        return self.strip_readline_artifacts(output)
+
+    @staticmethod
+    def strip_readline_artifacts(output):
         # readline trying to be friendly- remove these artifacts
         output = output.replace(' \r', '')
         output = output.replace('\r', '')
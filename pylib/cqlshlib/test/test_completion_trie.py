@@ -0,0 +1,68 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import re
+from unittest import TestCase
+
+from cqlshlib.completion_trie import Trie
+
+
+class TestCompletionTrie(TestCase):
+    words = ('in', 'index', 'infinity', 'insert', 'into', 'is', 'keyspace')
+
+    def test_contains(self):
+        trie = Trie(self.words)
+        for word in self.words:
+            self.assertIn(word, trie)
+        self.assertNotIn('', trie)
+        self.assertNotIn('ind', trie)
+        self.assertNotIn('indexes', trie)
+        self.assertNotIn('table', trie)
+
+    def test_children(self):
+        trie = Trie(self.words)
+        self.assertEqual(set(self.words), trie.children(''))
+        self.assertEqual(set(self.words), set(trie))
+        self.assertEqual({'in', 'index', 'infinity', 'insert', 'into'}, trie.children('in'))
+        self.assertEqual({'index'}, trie.children('ind'))
+        self.assertEqual({'index'}, trie.children('index'))
+        self.assertEqual(set(), trie.children('indexes'))
+        self.assertEqual(set(), trie.children('t'))
+
+    def test_longest_prefix(self):
+        trie = Trie(self.words)
+        self.assertEqual('in', trie.longest_prefix('ind'))
+        self.assertEqual('index', trie.longest_prefix('indexes'))
+        self.assertEqual('is', trie.longest_prefix('is'))
+        self.assertIsNone(trie.longest_prefix('i'))
+        self.assertIsNone(trie.longest_prefix('table'))
+        self.assertIsNone(Trie().longest_prefix(''))
+
+    def test_empty_word(self):
+        trie = Trie([''])
+        self.assertIn('', trie)
+        self.assertEqual('', trie.longest_prefix('anything'))
+        self.assertEqual({''}, trie.children(''))
+
+    def test_pattern(self):
+        trie = Trie(self.words)
+        self.assertEqual('(?:i(?:n(?:dex|finity|sert|to)?|s)|keyspace)', trie.pattern())
+        regex = re.compile(trie.pattern())
+        for word in self.words:
+            self.assertTrue(regex.fullmatch(word))
+        for word in ('', 'i', 'ind', 'indexes', 'table'):
+            self.assertIsNone(regex.fullmatch(word))
+        self.assertIsNone(re.match(Trie().pattern(), ''))
@@ -21,9 +21,11 @@
 import locale
 import os
 import re
+import unittest
 from .basecase import BaseTestCase
 from .cassconnect import create_db, remove_db, cqlsh_testrun
 from .run_cqlsh import TimeoutError
+from cqlshlib.completion_trie import Trie
 from cqlshlib.cql3handling import CqlRuleSet
 
 BEL = '\x07'  # the terminal-bell character
@@ -31,90 +33,171 @@ CTRL_C = '\x03'
 TAB = '\t'
 
 # completions not printed out in this many seconds may not be acceptable.
-# tune if needed for a slow system, etc, but be aware that the test will
-# need to wait this long for each completion test, to make sure more info
-# isn't coming
+# tune if needed for a slow system, etc.
 COMPLETION_RESPONSE_TIME = 0.5
 
-completion_separation_re = re.compile(r'\s+')
+# once cqlsh has started printing a completion, output is taken to be finished
+# after this many seconds without any more of it. the test waits at least this
+# long for each completion, to make sure more info isn't coming
+COMPLETION_QUIET_TIME = 0.1
+
+# environment settings for the cqlsh processes under test, on top of our own
+CQLSH_ENV_OVERRIDES = {'COLUMNS': '100000'}
+if locale.getpreferredencoding() != 'UTF-8':
+    CQLSH_ENV_OVERRIDES['LC_CTYPE'] = 'en_US.utf8'
+
+# the word being completed at the end of an input string
+partial_word_re = re.compile(r'\w*\Z')
+
+# when the tests are spread across pytest-xdist workers, the other workers'
+# test keyspaces come and go on the cluster while these tests run, so tests
+# expecting the exact set of keyspaces there can't be run alongside them
+lists_all_keyspaces = unittest.skipIf(int(os.environ.get('PYTEST_XDIST_WORKER_COUNT', '1')) > 1,
+                                      'lists every keyspace on the cluster; run without pytest-xdist')
+
+# table options offered after CREATE TABLE ... WITH
+_TABLE_WITH_OPTS = frozenset({'allow_auto_snapshot', 'bloom_filter_fp_chance', 'compaction',
+                              'compression', 'default_time_to_live', 'gc_grace_seconds',
+                              'incremental_backups', 'max_index_interval', 'memtable',
+                              'memtable_flush_period_in_ms', 'CLUSTERING', 'COMPACT', 'caching',
+                              'comment', 'min_index_interval', 'speculative_retry',
+                              'additional_write_policy', 'cdc', 'read_repair'})
+
+# compaction sub-options offered for each compaction strategy
+_STCS_OPTS = frozenset({'bucket_high', 'bucket_low', 'class', 'enabled', 'max_threshold',
+                        'min_sstable_size', 'min_threshold', 'tombstone_compaction_interval',
+                        'tombstone_threshold', 'unchecked_tombstone_compaction',
+                        'only_purge_repaired_tombstones', 'provide_overlapping_tombstones'})
+_TWCS_OPTS = frozenset({'compaction_window_unit', 'compaction_window_size',
+                        'timestamp_resolution', 'min_threshold', 'class', 'max_threshold',
+                        'tombstone_compaction_interval', 'tombstone_threshold',
+                        'enabled', 'unchecked_tombstone_compaction',
+                        'only_purge_repaired_tombstones', 'provide_overlapping_tombstones'})
+_UCS_OPTS = frozenset({'scaling_parameters', 'min_sstable_size',
+                       'flush_size_override', 'base_shard_count', 'class', 'target_sstable_size',
+                       'sstable_growth', 'max_sstables_to_compact',
+                       'enabled', 'expired_sstable_check_frequency_seconds',
+                       'unsafe_aggressive_sstable_expiration', 'overlap_inclusion_method',
+                       'tombstone_threshold', 'tombstone_compaction_interval',
+                       'unchecked_tombstone_compaction', 'provide_overlapping_tombstones',
+                       'max_threshold', 'only_purge_repaired_tombstones'})
+
+_WITH_OPTS_TRIE = Trie(_TABLE_WITH_OPTS)
+_STCS_OPTS_TRIE = Trie(_STCS_OPTS)
+_TWCS_OPTS_TRIE = Trie(_TWCS_OPTS)
+_UCS_OPTS_TRIE = Trie(_UCS_OPTS)
+
+# permissions offered by GRANT and REVOKE, and those still offered once
+# MODIFY has been listed
+_PERMISSIONS = frozenset({'ALL', 'ALTER', 'AUTHORIZE', 'CREATE', 'DESCRIBE', 'DROP', 'EXECUTE',
+                          'MODIFY', 'SELECT', 'UNMASK', 'SELECT_MASKED'})
+_PERMISSIONS_AFTER_MODIFY = _PERMISSIONS - {'ALL', 'MODIFY'}
+
+# resources offered after GRANT/REVOKE ... ON
+_RESOURCES = frozenset({'ALL', 'KEYSPACE', 'MBEANS', 'ROLE', 'FUNCTION', 'MBEAN', 'TABLE'})
+
+
+def setUpModule():
+    # every completion test only reads the schema, so all of the test classes
+    # in this module share a single test keyspace
+    create_db()
+
+
+def tearDownModule():
+    remove_db()
 
 
 class CqlshCompletionCase(BaseTestCase):
 
     @classmethod
     def setUpClass(cls):
-        create_db()
+        # spawning cqlsh and connecting it to the cluster costs far more than
+        # the few tab round-trips each test performs, so all of the tests in a
+        # class drive the same cqlsh process
+        cls._start_cqlsh()
 
     @classmethod
     def tearDownClass(cls):
-        remove_db()
+        cls.cqlsh_runner.__exit__(None, None, None)
 
-    def setUp(self):
-        env = os.environ.copy()
-        env['COLUMNS'] = '100000'
-        if (locale.getpreferredencoding() != 'UTF-8'):
-            env['LC_CTYPE'] = 'en_US.utf8'
-        self.cqlsh_runner = cqlsh_testrun(cqlver=None, env=env)
-        self.cqlsh = self.cqlsh_runner.__enter__()
+    @classmethod
+    def _start_cqlsh(cls):
+        env = dict(os.environ, **CQLSH_ENV_OVERRIDES)
+        cls.cqlsh_runner = cqlsh_testrun(cqlver=None, env=env)
+        cls.cqlsh = cls.cqlsh_runner.__enter__()
+        # the prompt is a regex; resolve the literal prompt cqlsh printed at
+        # startup once, so checking each completion is a plain suffix compare
+        cls.prompt_text = re.search(cls.cqlsh.prompt.lstrip() + r'\Z',
+                                    cls.cqlsh.output_header).group(0)
 
     def tearDown(self):
-        self.cqlsh_runner.__exit__(None, None, None)
+        # leave the shared process idle at a fresh prompt for the next test,
+        # replacing it if it can't get back to one
+        try:
+            self.cqlsh.send(CTRL_C)
+            self.cqlsh.read_to_next_prompt(timeout=1.0)
+        except (TimeoutError, EOFError, OSError):
+            self.cqlsh_runner.__exit__(None, None, None)
+            self._start_cqlsh()
 
-    def _get_completions(self, inputstring, split_completed_lines=True):
+    def _get_completions(self, inputstring, split_completed_lines=True, typed=None):
         """
         Get results of tab completion in cqlsh. Returns a bare string if a
         string completes immediately. Otherwise, returns a set of all
         whitespace-separated tokens in the offered completions by default, or a
         list of the lines in the offered completions if split_completed_lines is
         False.
+
+        If typed is given, it is the text already on the cqlsh input line and
+        must be a prefix of inputstring. Only the rest of inputstring is sent,
+        and the line is left in place afterwards instead of being cancelled.
         """
-        self.cqlsh.send(inputstring)
+        tosend = inputstring if typed is None else inputstring[len(typed):]
+        self.cqlsh.send(tosend)
         self.cqlsh.send(TAB)
-        immediate = self.cqlsh.read_up_to_timeout(COMPLETION_RESPONSE_TIME)
-        immediate = immediate.replace(' \b', '')
-        self.assertEqual(immediate[:len(inputstring)], inputstring)
-        immediate = immediate[len(inputstring):]
-        immediate = immediate.replace(BEL, '')
+        # wait for the completion itself, not just the echo of what was typed
+        immediate = self.cqlsh.read_until_quiet(COMPLETION_QUIET_TIME, COMPLETION_RESPONSE_TIME,
+                                                after=len(tosend))
+        # strip the bell and readline's space-backspace artifacts up front
+        immediate = immediate.replace(BEL, '').replace(' \b', '')
+        self.assertEqual(immediate[:len(tosend)], tosend)
+        immediate = immediate[len(tosend):]
 
         if immediate:
             return immediate
 
         self.cqlsh.send(TAB)
-        choice_output = self.cqlsh.read_up_to_timeout(COMPLETION_RESPONSE_TIME)
-        if choice_output == BEL:
-            choice_output = ''
+        choice_output = self.cqlsh.read_until_quiet(COMPLETION_QUIET_TIME, COMPLETION_RESPONSE_TIME)
 
-        self.cqlsh.send(CTRL_C)  # cancel any current line
-        self.cqlsh.read_to_next_prompt()
+        if typed is None:
+            self.cqlsh.send(CTRL_C)  # cancel any current line
+            self.cqlsh.read_to_next_prompt()
+
+        if not choice_output or choice_output == BEL:
+            # nothing offered
+            return set() if split_completed_lines else []
 
         choice_lines = choice_output.splitlines()
         if choice_lines:
             # ensure the last line of the completion is the prompt
-            prompt_regex = self.cqlsh.prompt.lstrip() + re.escape(inputstring)
             msg = ('Double-tab completion '
                    'does not print prompt for input "{}"'.format(inputstring))
-            self.assertRegex(choice_lines[-1], prompt_regex, msg=msg)
+            self.assertTrue(choice_lines[-1].endswith(self.prompt_text + inputstring), msg=msg)
 
         choice_lines = [line.strip() for line in choice_lines[:-1]]
         choice_lines = [line for line in choice_lines if line]
 
-        if split_completed_lines:
-            completed_lines = list(map(set, (completion_separation_re.split(line.strip())
-                                             for line in choice_lines)))
-
-            if not completed_lines:
-                return set()
-
-            completed_tokens = set.union(*completed_lines)
-            return completed_tokens - {''}
-        else:
+        if not split_completed_lines:
             return choice_lines
 
-        assert False
+        completed_tokens = set()
+        for line in choice_lines:
+            completed_tokens.update(line.split())
+        return completed_tokens
 
     def _trycompletions_inner(self, inputstring, immediate='', choices=(),
                               other_choices_ok=False,
-                              split_completed_lines=True):
+                              split_completed_lines=True, typed=None):
         """
         Test tab completion in cqlsh. Enters in the text in inputstring, then
         simulates a tab keypress to see what is immediately completed (this
@@ -123,19 +206,47 @@ class CqlshCompletionCase(BaseTestCase):
         'immediate'. If there is no immediate completion, another tab keypress
         is simulated in order to get a list of choices, which are expected to
         match the items in 'choices' (order is not important, but case is).
+        If 'choices' is a Trie, the expected items are those of its words which
+        start with the partial word at the end of inputstring.
+
+        Returns the text left on the input line, or None if it is not known.
         """
         completed = self._get_completions(inputstring,
-                                          split_completed_lines=split_completed_lines)
+                                          split_completed_lines=split_completed_lines,
+                                          typed=typed)
 
         if immediate:
-            msg = 'cqlsh completed %r (%d), but we expected %r (%d)' % (completed, len(completed), immediate, len(immediate))
-            self.assertEqual(completed, immediate, msg=msg)
-            return
-
+            if completed != immediate:
+                self.fail('cqlsh completed %r (%d), but we expected %r (%d)'
+                          % (completed, len(completed), immediate, len(immediate)))
+            if '\b' in completed:
+                # readline rewrote part of the line
+                return None
+            return inputstring + completed
+
+        if isinstance(choices, Trie):
+            expected = choices.children(partial_word_re.search(inputstring).group())
+        elif isinstance(choices, (set, frozenset)):
+            expected = choices
+        else:
+            expected = set(choices)
         if other_choices_ok:
-            self.assertEqual(set(choices), completed.intersection(choices))
+            missing = expected - completed
+            self.assertFalse(missing, msg='expected choices not offered for %r: %r' % (inputstring, missing))
         else:
-            self.assertEqual(set(choices), set(completed))
+            if not isinstance(completed, set):
+                completed = set(completed)
+            self.assertEqual(expected, completed)
+        return inputstring
+
+    def _cancel_line(self):
+        try:
+            self.cqlsh.send(CTRL_C)  # cancel any current line
+            self.cqlsh.read_to_next_prompt(timeout=1.0)
+        except TimeoutError:
+            # retry once
+            self.cqlsh.send(CTRL_C)
+            self.cqlsh.read_to_next_prompt(timeout=10.0)
 
     def trycompletions(self, inputstring, immediate='', choices=(),
                        other_choices_ok=False, split_completed_lines=True):
@@ -144,27 +255,97 @@ class CqlshCompletionCase(BaseTestCase):
                                        other_choices_ok=other_choices_ok,
                                        split_completed_lines=split_completed_lines)
         finally:
-            try:
-                self.cqlsh.send(CTRL_C)  # cancel any current line
-                self.cqlsh.read_to_next_prompt(timeout=1.0)
-            except TimeoutError:
-                # retry once
-                self.cqlsh.send(CTRL_C)
-                self.cqlsh.read_to_next_prompt(timeout=10.0)
-
-    def strategies(self):
+            self._cancel_line()
+
+    def trycompletions_chain(self, steps, prefix=''):
+        """
+        Run trycompletions() for each (inputstring, kwargs) pair in steps,
+        keeping the cqlsh input line between steps. When a step's inputstring
+        extends whatever is on the line (including text completed by the
+        previous step), only the new text is typed. Otherwise, the line is
+        cancelled and inputstring is typed afresh. If prefix is given, it is
+        prepended to every step's inputstring.
+        """
+        line = ''
+        try:
+            for suffix, kwargs in steps:
+                inputstring = prefix + suffix
+                if line is None or not inputstring.startswith(line):
+                    self._cancel_line()
+                    line = ''
+                line = self._trycompletions_inner(inputstring, typed=line, **kwargs)
+        finally:
+            self._cancel_line()
+
+    @classmethod
+    def strategies(cls):
         return CqlRuleSet.replication_strategies
 
 
 class TestCqlshCompletion(CqlshCompletionCase):
     cqlver = '3.1.6'
 
+    # choices offered at the start of a statement
+    _TOP_LEVEL_CHOICES = frozenset({'?', 'ALTER', 'BEGIN', 'CAPTURE', 'CONSISTENCY',
+                                    'COPY', 'CREATE', 'DEBUG', 'DELETE', 'DESC', 'DESCRIBE',
+                                    'DROP', 'GRANT', 'HELP', 'INSERT', 'LIST', 'LOGIN', 'PAGING', 'REVOKE',
+                                    'SELECT', 'SHOW', 'SOURCE', 'TRACING', 'ELAPSED', 'EXPAND', 'SERIAL', 'TRUNCATE',
+                                    'UPDATE', 'USE', 'exit', 'quit', 'CLEAR', 'CLS', 'history'})
+
+    # tables created in the test keyspace by test_keyspace_init.cql
+    _USER_TABLES = frozenset({'twenty_rows_table', 'ascii_with_special_chars', 'users',
+                              'has_all_types', 'empty_composite_table', 'empty_table',
+                              'undefined_values_table', 'dynamic_columns',
+                              'twenty_rows_composite_table', 'utf8_with_special_chars', 'songs'})
+
+    # choices offered wherever a table name is expected
+    _TABLE_CHOICES = _USER_TABLES | {'system.', 'system_traces.'}
+
+    # types, functions and aggregates created by test_keyspace_init.cql
+    _USER_TYPES = frozenset({'address', 'phone_number', 'band_info_type', 'tags'})
+    _USER_FUNCTIONS = frozenset({'fbestband', 'fbestsong', 'fmax', 'fmin'})
+    _USER_AGGREGATES = frozenset({'aggmin', 'aggmax'})
+
+    # system keyspaces offered as qualifiers by DESCRIBE
+    _SYSTEM_KEYSPACE_CHOICES = frozenset({'system.', 'system_auth.', 'system_traces.', 'system_distributed.'})
+
+    # (inputstring, trycompletions kwargs) steps for test_complete_in_grant
+    _GRANT_CASES = (
+        ("GR", dict(immediate='ANT ')),
+        ("GRANT ", dict(choices=_PERMISSIONS, other_choices_ok=True)),
+        ("GRANT MODIFY ", dict(choices=[',', 'ON', 'PERMISSION'])),
+        ("GRANT MODIFY P", dict(immediate='ERMISSION ')),
+        ("GRANT MODIFY PERMISSION ", dict(choices=[',', 'ON'])),
+        ("GRANT MODIFY PERMISSION, ", dict(choices=_PERMISSIONS_AFTER_MODIFY)),
+        ("GRANT MODIFY PERMISSION, D", dict(choices=['DESCRIBE', 'DROP'])),
+        ("GRANT MODIFY PERMISSION, DR", dict(immediate='OP ')),
+        ("GRANT MODIFY PERMISSION, DROP O", dict(immediate='N ')),
+        ("GRANT MODIFY, DROP ON ", dict(choices=_RESOURCES, other_choices_ok=True)),
+        ("GRANT MODIFY, DROP ON ALL ", dict(choices=['KEYSPACES', 'TABLES'], other_choices_ok=True)),
+        ("GRANT MODIFY PERMISSION ON KEY", dict(immediate='SPACE ')),
+        ("GRANT MODIFY PERMISSION ON KEYSPACE system_tr", dict(immediate='aces TO ')),
+    )
+
+    # (inputstring, trycompletions kwargs) steps for test_complete_in_revoke
+    _REVOKE_CASES = (
+        ("RE", dict(immediate='VOKE ')),
+        ("REVOKE ", dict(choices=_PERMISSIONS, other_choices_ok=True)),
+        ("REVOKE MODIFY ", dict(choices=[',', 'ON', 'PERMISSION'])),
+        ("REVOKE MODIFY P", dict(immediate='ERMISSION ')),
+        ("REVOKE MODIFY PERMISSION ", dict(choices=[',', 'ON'])),
+        ("REVOKE MODIFY PERMISSION, ", dict(choices=_PERMISSIONS_AFTER_MODIFY)),
+        ("REVOKE MODIFY PERMISSION, D", dict(choices=['DESCRIBE', 'DROP'])),
+        ("REVOKE MODIFY PERMISSION, DR", dict(immediate='OP ')),
+        ("REVOKE MODIFY PERMISSION, DROP ", dict(choices=[',', 'ON', 'PERMISSION'])),
+        ("REVOKE MODIFY PERMISSION, DROP O", dict(immediate='N ')),
+        ("REVOKE MODIFY PERMISSION, DROP ON ", dict(choices=_RESOURCES, other_choices_ok=True)),
+        ("REVOKE MODIFY, DROP ON ALL ", dict(choices=['KEYSPACES', 'TABLES'], other_choices_ok=True)),
+        ("REVOKE MODIFY PERMISSION, DROP ON KEY", dict(immediate='SPACE ')),
+        ("REVOKE MODIFY PERMISSION, DROP ON KEYSPACE system_tr", dict(immediate='aces FROM ')),
+    )
+
     def test_complete_on_empty_string(self):
-        self.trycompletions('', choices=('?', 'ALTER', 'BEGIN', 'CAPTURE', 'CONSISTENCY',
-                                         'COPY', 'CREATE', 'DEBUG', 'DELETE', 'DESC', 'DESCRIBE',
-                                         'DROP', 'GRANT', 'HELP', 'INSERT', 'LIST', 'LOGIN', 'PAGING', 'REVOKE',
-                                         'SELECT', 'SHOW', 'SOURCE', 'TRACING', 'ELAPSED', 'EXPAND', 'SERIAL', 'TRUNCATE',
-                                         'UPDATE', 'USE', 'exit', 'quit', 'CLEAR', 'CLS', 'history'))
+        self.trycompletions('', choices=self._TOP_LEVEL_CHOICES)
 
     def test_complete_command_words(self):
         self.trycompletions('alt', '\b\b\bALTER ')
@@ -178,179 +359,99 @@ class TestCqlshCompletion(CqlshCompletionCase):
         pass
 
     def test_complete_in_insert(self):
-        self.trycompletions('INSERT INTO  ',
-                            choices=('twenty_rows_table',
-                                     'ascii_with_special_chars',
-                                     'users',
-                                     'has_all_types',
-                                     'system.',
-                                     'empty_composite_table',
-                                     'empty_table',
-                                     'undefined_values_table',
-                                     'dynamic_columns',
-                                     'twenty_rows_composite_table',
-                                     'utf8_with_special_chars',
-                                     'system_traces.',
-                                     'songs'),
-                            other_choices_ok=True)
-        self.trycompletions('INSERT INTO twenty_rows_composite_table',
-                            immediate=' ')
-        self.trycompletions('INSERT INTO twenty_rows_composite_table ',
-                            choices=['(', 'JSON'])
-        self.trycompletions('INSERT INTO twenty_rows_composite_table (a, b ',
-                            choices=(')', ','))
-        self.trycompletions('INSERT INTO twenty_rows_composite_table (a, b, ',
-                            immediate='c ')
-        self.trycompletions('INSERT INTO twenty_rows_composite_table (a, b, c ',
-                            choices=(',', ')'))
-        self.trycompletions('INSERT INTO twenty_rows_composite_table (a, b)',
-                            immediate=' VALUES ( ')
-        self.trycompletions('INSERT INTO twenty_rows_composite_table (a, b, c) VAL',
-                            immediate='UES ( ')
-
-        self.trycompletions(
-            'INSERT INTO twenty_rows_composite_table (a, b, c) VALUES (',
-            choices=['<value for a (text)>'],
-            split_completed_lines=False)
-
-        self.trycompletions(
-            "INSERT INTO twenty_rows_composite_table (a, b, c) VALUES ('",
-            choices=['<value for a (text)>'],
-            split_completed_lines=False)
-
-        self.trycompletions(
-            "INSERT INTO twenty_rows_composite_table (a, b, c) VALUES ( 'eggs",
-            choices=['<value for a (text)>'],
-            split_completed_lines=False)
-
-        self.trycompletions(
-            "INSERT INTO twenty_rows_composite_table (a, b, c) VALUES ('eggs'",
-            immediate=', ')
-
-        self.trycompletions(
+        self.trycompletions_chain([
+            ('INSERT INTO  ',
+             dict(choices=self._TABLE_CHOICES, other_choices_ok=True)),
+            ('INSERT INTO twenty_rows_composite_table',
+             dict(immediate=' ')),
+            ('INSERT INTO twenty_rows_composite_table ',
+             dict(choices=['(', 'JSON'])),
+            ('INSERT INTO twenty_rows_composite_table (a, b ',
+             dict(choices=(')', ','))),
+            ('INSERT INTO twenty_rows_composite_table (a, b, ',
+             dict(immediate='c ')),
+            ('INSERT INTO twenty_rows_composite_table (a, b, c ',
+             dict(choices=(',', ')'))),
+            ('INSERT INTO twenty_rows_composite_table (a, b)',
+             dict(immediate=' VALUES ( ')),
+            ('INSERT INTO twenty_rows_composite_table (a, b, c) VAL',
+             dict(immediate='UES ( ')),
+            ('INSERT INTO twenty_rows_composite_table (a, b, c) VALUES (',
+             dict(choices=['<value for a (text)>'], split_completed_lines=False)),
+            ("INSERT INTO twenty_rows_composite_table (a, b, c) VALUES ('",
+             dict(choices=['<value for a (text)>'], split_completed_lines=False)),
+            ("INSERT INTO twenty_rows_composite_table (a, b, c) VALUES ( 'eggs",
+             dict(choices=['<value for a (text)>'], split_completed_lines=False)),
+            ("INSERT INTO twenty_rows_composite_table (a, b, c) VALUES ('eggs'",
+             dict(immediate=', ')),
             ("INSERT INTO twenty_rows_composite_table (a, b, c) "
-             "VALUES ( 'eggs',"),
-            choices=['<value for b (text)>'],
-            split_completed_lines=False)
-
-        self.trycompletions(
+             "VALUES ( 'eggs',",
+             dict(choices=['<value for b (text)>'], split_completed_lines=False)),
             ("INSERT INTO twenty_rows_composite_table (a, b, c) "
-             "VALUES ( 'eggs', 'sausage', 'spam')"),
-            immediate=' ')
-
-        self.trycompletions(
+             "VALUES ( 'eggs', 'sausage', 'spam')",
+             dict(immediate=' ')),
             ("INSERT INTO twenty_rows_composite_table (a, b, c) "
-             "VALUES ( 'eggs', 'sausage', 'spam') "),
-            choices=[';', 'USING', 'IF'])
-
-        self.trycompletions(
+             "VALUES ( 'eggs', 'sausage', 'spam') ",
+             dict(choices=[';', 'USING', 'IF'])),
             ("INSERT INTO twenty_rows_composite_table (a, b, c) "
-             "VALUES ( 'eggs', 'sausage', 'spam');"),
-            choices=['?', 'ALTER', 'BEGIN', 'CAPTURE', 'CONSISTENCY', 'COPY',
-                     'CREATE', 'DEBUG', 'DELETE', 'DESC', 'DESCRIBE', 'DROP',
-                     'ELAPSED', 'EXPAND', 'GRANT', 'HELP', 'INSERT', 'LIST', 'LOGIN', 'PAGING',
-                     'REVOKE', 'SELECT', 'SHOW', 'SOURCE', 'SERIAL', 'TRACING',
-                     'TRUNCATE', 'UPDATE', 'USE', 'exit', 'history', 'quit',
-                     'CLEAR', 'CLS'])
-
-        self.trycompletions(
+             "VALUES ( 'eggs', 'sausage', 'spam');",
+             dict(choices=self._TOP_LEVEL_CHOICES)),
             ("INSERT INTO twenty_rows_composite_table (a, b, c) "
-             "VALUES ( 'eggs', 'sausage', 'spam') US"),
-            immediate='ING T')
-
-        self.trycompletions(
+             "VALUES ( 'eggs', 'sausage', 'spam') US",
+             dict(immediate='ING T')),
             ("INSERT INTO twenty_rows_composite_table (a, b, c) "
-             "VALUES ( 'eggs', 'sausage', 'spam') USING"),
-            immediate=' T')
-
-        self.trycompletions(
+             "VALUES ( 'eggs', 'sausage', 'spam') USING",
+             dict(immediate=' T')),
             ("INSERT INTO twenty_rows_composite_table (a, b, c) "
-             "VALUES ( 'eggs', 'sausage', 'spam') USING T"),
-            choices=['TTL', 'TIMESTAMP'])
-
-        self.trycompletions(
+             "VALUES ( 'eggs', 'sausage', 'spam') USING T",
+             dict(choices=['TTL', 'TIMESTAMP'])),
             ("INSERT INTO twenty_rows_composite_table (a, b, c) "
-             "VALUES ( 'eggs', 'sausage', 'spam') USING TT"),
-            immediate='L ')
-
-        self.trycompletions(
+             "VALUES ( 'eggs', 'sausage', 'spam') USING TT",
+             dict(immediate='L ')),
             ("INSERT INTO twenty_rows_composite_table (a, b, c) "
-             "VALUES ( 'eggs', 'sausage', 'spam') USING TI"),
-            immediate='MESTAMP ')
-
-        self.trycompletions(
+             "VALUES ( 'eggs', 'sausage', 'spam') USING TI",
+             dict(immediate='MESTAMP ')),
             ("INSERT INTO twenty_rows_composite_table (a, b, c) "
-             "VALUES ( 'eggs', 'sausage', 'spam') USING TIMESTAMP "),
-            choices=['<wholenumber>'])
-
-        self.trycompletions(
+             "VALUES ( 'eggs', 'sausage', 'spam') USING TIMESTAMP ",
+             dict(choices=['<wholenumber>'])),
             ("INSERT INTO twenty_rows_composite_table (a, b, c) "
-             "VALUES ( 'eggs', 'sausage', 'spam') USING TTL "),
-            choices=['<wholenumber>'])
-
-        self.trycompletions(
+             "VALUES ( 'eggs', 'sausage', 'spam') USING TTL ",
+             dict(choices=['<wholenumber>'])),
             ("INSERT INTO twenty_rows_composite_table (a, b, c) "
-             "VALUES ( 'eggs', 'sausage', 'spam') USING TIMESTAMP 0 "),
-            choices=['AND', ';'])
-
-        self.trycompletions(
+             "VALUES ( 'eggs', 'sausage', 'spam') USING TIMESTAMP 0 ",
+             dict(choices=['AND', ';'])),
             ("INSERT INTO twenty_rows_composite_table (a, b, c) "
-             "VALUES ( 'eggs', 'sausage', 'spam') USING TTL 0 "),
-            choices=['AND', ';'])
-
-        self.trycompletions(
+             "VALUES ( 'eggs', 'sausage', 'spam') USING TTL 0 ",
+             dict(choices=['AND', ';'])),
             ("INSERT INTO twenty_rows_composite_table (a, b, c) "
-             "VALUES ( 'eggs', 'sausage', 'spam') USING TIMESTAMP 0 A"),
-            immediate='ND TTL ')
-
-        self.trycompletions(
+             "VALUES ( 'eggs', 'sausage', 'spam') USING TIMESTAMP 0 A",
+             dict(immediate='ND TTL ')),
             ("INSERT INTO twenty_rows_composite_table (a, b, c) "
-             "VALUES ( 'eggs', 'sausage', 'spam') USING TTL 0 A"),
-            immediate='ND TIMESTAMP ')
-
-        self.trycompletions(
+             "VALUES ( 'eggs', 'sausage', 'spam') USING TTL 0 A",
+             dict(immediate='ND TIMESTAMP ')),
             ("INSERT INTO twenty_rows_composite_table (a, b, c) "
-             "VALUES ( 'eggs', 'sausage', 'spam') USING TTL 0 AND TIMESTAMP "),
-            choices=['<wholenumber>'])
-
-        self.trycompletions(
+             "VALUES ( 'eggs', 'sausage', 'spam') USING TTL 0 AND TIMESTAMP ",
+             dict(choices=['<wholenumber>'])),
             ("INSERT INTO twenty_rows_composite_table (a, b, c) "
-             "VALUES ( 'eggs', 'sausage', 'spam') USING TTL 0 AND TIMESTAMP 0 "),
-            choices=['AND', ';'])
-
-        self.trycompletions(
+             "VALUES ( 'eggs', 'sausage', 'spam') USING TTL 0 AND TIMESTAMP 0 ",
+             dict(choices=['AND', ';'])),
             ("INSERT INTO twenty_rows_composite_table (a, b, c) "
-             "VALUES ( 'eggs', 'sausage', 'spam') USING TTL 0 AND TIMESTAMP 0 AND "),
-            choices=[])
-
-        self.trycompletions(
-            ("INSERT INTO has_all_types (num, setcol) VALUES (0, "),
-            immediate="{ ")
-
-        self.trycompletions(
-            ("INSERT INTO has_all_types (num, mapcol) VALUES (0, "),
-            immediate="{ ")
-
-        self.trycompletions(
-            ("INSERT INTO has_all_types (num, listcol) VALUES (0, "),
-            immediate="[ ")
-
-        self.trycompletions(
-            ("INSERT INTO has_all_types (num, vectorcol) VALUES (0, "),
-            immediate="[ ")
+             "VALUES ( 'eggs', 'sausage', 'spam') USING TTL 0 AND TIMESTAMP 0 AND ",
+             dict(choices=[])),
+            ("INSERT INTO has_all_types (num, setcol) VALUES (0, ",
+             dict(immediate="{ ")),
+            ("INSERT INTO has_all_types (num, mapcol) VALUES (0, ",
+             dict(immediate="{ ")),
+            ("INSERT INTO has_all_types (num, listcol) VALUES (0, ",
+             dict(immediate="[ ")),
+            ("INSERT INTO has_all_types (num, vectorcol) VALUES (0, ",
+             dict(immediate="[ ")),
+        ])
 
     def test_complete_in_update(self):
         self.trycompletions("UPD", immediate="ATE ")
         self.trycompletions("UPDATE ",
-                            choices=['twenty_rows_table',
-                                     'users', 'has_all_types', 'system.',
-                                     'ascii_with_special_chars',
-                                     'empty_composite_table', 'empty_table',
-                                     'undefined_values_table',
-                                     'dynamic_columns',
-                                     'twenty_rows_composite_table',
-                                     'utf8_with_special_chars',
-                                     'system_traces.', 'songs'],
+                            choices=self._TABLE_CHOICES,
                             other_choices_ok=True)
 
         self.trycompletions("UPDATE empty_table ", choices=['USING', 'SET'])
@@ -422,31 +523,14 @@ class TestCqlshCompletion(CqlshCompletionCase):
                             choices=['<identifier>', '<quotedName>'])
 
         self.trycompletions('DELETE a FROM ',
-                            choices=['twenty_rows_table',
-                                     'ascii_with_special_chars', 'users',
-                                     'has_all_types', 'system.',
-                                     'empty_composite_table', 'empty_table',
-                                     'system_auth.', 'undefined_values_table',
-                                     'dynamic_columns',
-                                     'twenty_rows_composite_table',
-                                     'utf8_with_special_chars',
-                                     'system_traces.', 'songs',
-                                     self.cqlsh.keyspace + '.'],
+                            choices=self._TABLE_CHOICES | {'system_auth.',
+                                                           self.cqlsh.keyspace + '.'},
                             other_choices_ok=True)
 
         self.trycompletions('DELETE FROM ',
-                            choices=['twenty_rows_table',
-                                     'ascii_with_special_chars', 'users',
-                                     'has_all_types', 'system.',
-                                     'empty_composite_table', 'empty_table',
-                                     'system_auth.', 'undefined_values_table',
-                                     'dynamic_columns',
-                                     'twenty_rows_composite_table',
-                                     'utf8_with_special_chars',
-                                     'system_traces.', 'songs',
-                                     'system_auth.', 'system_distributed.',
-                                     'system_schema.', 'system_traces.',
-                                     self.cqlsh.keyspace + '.'],
+                            choices=self._TABLE_CHOICES | {'system_auth.', 'system_distributed.',
+                                                           'system_schema.',
+                                                           self.cqlsh.keyspace + '.'},
                             other_choices_ok=True)
         self.trycompletions('DELETE FROM twenty_rows_composite_table ',
                             choices=['USING', 'WHERE'])
@@ -572,6 +656,7 @@ class TestCqlshCompletion(CqlshCompletionCase):
                                      'INDEX', 'KEYSPACE', 'ROLE', 'TABLE',
                                      'TRIGGER', 'TYPE', 'USER', 'MATERIALIZED'])
 
+    @lists_all_keyspaces
     def test_complete_in_drop_keyspace(self):
         self.trycompletions('DROP K', immediate='EYSPACE ')
         quoted_keyspace = '"' + self.cqlsh.keyspace + '"'
@@ -587,6 +672,7 @@ class TestCqlshCompletion(CqlshCompletionCase):
     def test_complete_in_create_type(self):
         self.trycompletions('CREATE TYPE foo ', choices=['(', '.'])
 
+    @lists_all_keyspaces
     def test_complete_in_drop_type(self):
         self.trycompletions('DROP TYPE ',
                             choices=['IF', 'system_views.', 'system_metrics.',
@@ -607,6 +693,10 @@ class TestCqlshCompletion(CqlshCompletionCase):
         test avoids duplication between tests for the two statements."""
         prefix = 'CREATE ' + name + ' '
         quoted_keyspace = '"' + self.cqlsh.keyspace + '"'
+        new_table = prefix + ' new_table ('
+        with_opts = new_table + 'col_a int PRIMARY KEY) WITH '
+        comp = "compaction = {'class': '"
+        stcs = comp + "SizeTieredCompactionStrategy'"
         self.trycompletions(prefix + '',
                             choices=['IF', self.cqlsh.keyspace, '<new_table_name>'])
         self.trycompletions(prefix + 'IF ',
@@ -630,135 +720,68 @@ class TestCqlshCompletion(CqlshCompletionCase):
                             choices=['<new_column_name>', '<identifier>',
                                      '<quotedName>'])
 
-        self.trycompletions(prefix + ' new_table ( ',
+        self.trycompletions(new_table + ' ',
                             choices=['<new_column_name>', '<identifier>',
                                      '<quotedName>'])
-        self.trycompletions(prefix + ' new_table (col_a ine',
+        self.trycompletions(new_table + 'col_a ine',
                             immediate='t ')
-        self.trycompletions(prefix + ' new_table (col_a int ',
+        self.trycompletions(new_table + 'col_a int ',
                             choices=[',', 'MASKED', 'PRIMARY'])
-        self.trycompletions(prefix + ' new_table (col_a int M',
+        self.trycompletions(new_table + 'col_a int M',
                             immediate='ASKED WITH ')
-        self.trycompletions(prefix + ' new_table (col_a int MASKED WITH ',
+        self.trycompletions(new_table + 'col_a int MASKED WITH ',
                             choices=['DEFAULT', self.cqlsh.keyspace + '.', 'system.'],
                             other_choices_ok=True)
-        self.trycompletions(prefix + ' new_table (col_a int P',
+        self.trycompletions(new_table + 'col_a int P',
                             immediate='RIMARY KEY ')
-        self.trycompletions(prefix + ' new_table (col_a int PRIMARY KEY ',
+        self.trycompletions(new_table + 'col_a int PRIMARY KEY ',
                             choices=[')', ','])
 
-        self.trycompletions(prefix + ' new_table (col_a v',
+        self.trycompletions(new_table + 'col_a v',
                             choices=['varchar', 'varint', 'vector'])
-        self.trycompletions(prefix + ' new_table (col_a ve',
+        self.trycompletions(new_table + 'col_a ve',
                             immediate='ctor ')
-        self.trycompletions(prefix + ' new_table (col_a vector<',
+        self.trycompletions(new_table + 'col_a vector<',
                             choices=['address', 'boolean', 'duration', 'list'],
                             other_choices_ok=True)
-        self.trycompletions(prefix + ' new_table (col_a vector<float, ',
+        self.trycompletions(new_table + 'col_a vector<float, ',
                             choices=['<wholenumber>'])
-        self.trycompletions(prefix + ' new_table (col_a vector<float, 2 ',
+        self.trycompletions(new_table + 'col_a vector<float, 2 ',
                             immediate='>')
 
-        self.trycompletions(prefix + ' new_table (col_a int PRIMARY KEY,',
+        self.trycompletions(new_table + 'col_a int PRIMARY KEY,',
                             choices=['<identifier>', '<quotedName>'])
-        self.trycompletions(prefix + ' new_table (col_a int PRIMARY KEY)',
+        self.trycompletions(new_table + 'col_a int PRIMARY KEY)',
                             immediate=' ')
-        self.trycompletions(prefix + ' new_table (col_a int PRIMARY KEY) ',
+        self.trycompletions(new_table + 'col_a int PRIMARY KEY) ',
                             choices=[';', 'WITH'])
-        self.trycompletions(prefix + ' new_table (col_a int PRIMARY KEY) W',
+        self.trycompletions(new_table + 'col_a int PRIMARY KEY) W',
                             immediate='ITH ')
-        self.trycompletions(prefix + ' new_table (col_a int PRIMARY KEY) WITH ',
-                            choices=['allow_auto_snapshot',
-                                     'bloom_filter_fp_chance', 'compaction',
-                                     'compression',
-                                     'default_time_to_live', 'gc_grace_seconds',
-                                     'incremental_backups',
-                                     'max_index_interval',
-                                     'memtable',
-                                     'memtable_flush_period_in_ms',
-                                     'CLUSTERING',
-                                     'COMPACT', 'caching', 'comment',
-                                     'min_index_interval', 'speculative_retry', 'additional_write_policy', 'cdc', 'read_repair'])
-        self.trycompletions(prefix + ' new_table (col_a int PRIMARY KEY) WITH ',
-                            choices=['allow_auto_snapshot',
-                                     'bloom_filter_fp_chance', 'compaction',
-                                     'compression',
-                                     'default_time_to_live', 'gc_grace_seconds',
-                                     'incremental_backups',
-                                     'max_index_interval',
-                                     'memtable',
-                                     'memtable_flush_period_in_ms',
-                                     'CLUSTERING',
-                                     'COMPACT', 'caching', 'comment',
-                                     'min_index_interval', 'speculative_retry', 'additional_write_policy', 'cdc', 'read_repair'])
-        self.trycompletions(prefix + ' new_table (col_a int PRIMARY KEY) WITH bloom_filter_fp_chance ',
+        self.trycompletions(with_opts, choices=_WITH_OPTS_TRIE)
+        self.trycompletions(with_opts + 'bloom_filter_fp_chance ',
                             immediate='= ')
-        self.trycompletions(prefix + ' new_table (col_a int PRIMARY KEY) WITH bloom_filter_fp_chance = ',
+        self.trycompletions(with_opts + 'bloom_filter_fp_chance = ',
                             choices=['<float_between_0_and_1>'])
 
-        self.trycompletions(prefix + ' new_table (col_a int PRIMARY KEY) WITH compaction ',
-                            immediate="= {'class': '")
-        self.trycompletions(prefix + " new_table (col_a int PRIMARY KEY) WITH compaction = "
-                            + "{'class': '",
-                            choices=['SizeTieredCompactionStrategy',
-                                     'LeveledCompactionStrategy',
-                                     'TimeWindowCompactionStrategy',
-                                     'UnifiedCompactionStrategy'])
-        self.trycompletions(prefix + " new_table (col_a int PRIMARY KEY) WITH compaction = "
-                            + "{'class': 'S",
-                            immediate="izeTieredCompactionStrategy'")
-        self.trycompletions(prefix + " new_table (col_a int PRIMARY KEY) WITH compaction = "
-                            + "{'class': 'SizeTieredCompactionStrategy",
-                            immediate="'")
-        self.trycompletions(prefix + " new_table (col_a int PRIMARY KEY) WITH compaction = "
-                            + "{'class': 'SizeTieredCompactionStrategy'",
-                            choices=['}', ','])
-        self.trycompletions(prefix + " new_table (col_a int PRIMARY KEY) WITH compaction = "
-                            + "{'class': 'SizeTieredCompactionStrategy', ",
-                            immediate="'")
-        self.trycompletions(prefix + " new_table (col_a int PRIMARY KEY) WITH compaction = "
-                            + "{'class': 'SizeTieredCompactionStrategy', '",
-                            choices=['bucket_high', 'bucket_low', 'class',
-                                     'enabled', 'max_threshold',
-                                     'min_sstable_size', 'min_threshold',
-                                     'tombstone_compaction_interval',
-                                     'tombstone_threshold',
-                                     'unchecked_tombstone_compaction',
-                                     'only_purge_repaired_tombstones',
-                                     'provide_overlapping_tombstones'])
-        self.trycompletions(prefix + " new_table (col_a int PRIMARY KEY) WITH compaction = "
-                            + "{'class': 'SizeTieredCompactionStrategy'}",
-                            choices=[';', 'AND'])
-        self.trycompletions(prefix + " new_table (col_a int PRIMARY KEY) WITH compaction = "
-                            + "{'class': 'SizeTieredCompactionStrategy'} AND ",
-                            choices=['allow_auto_snapshot', 'bloom_filter_fp_chance', 'compaction',
-                                     'compression',
-                                     'default_time_to_live', 'gc_grace_seconds',
-                                     'incremental_backups',
-                                     'max_index_interval',
-                                     'memtable',
-                                     'memtable_flush_period_in_ms',
-                                     'CLUSTERING',
-                                     'COMPACT', 'caching', 'comment',
-                                     'min_index_interval', 'speculative_retry', 'additional_write_policy', 'cdc', 'read_repair'])
-        self.trycompletions(prefix + " new_table (col_a int PRIMARY KEY) WITH compaction = "
-                            + "{'class': 'TimeWindowCompactionStrategy', '",
-                            choices=['compaction_window_unit', 'compaction_window_size',
-                                     'timestamp_resolution', 'min_threshold', 'class', 'max_threshold',
-                                     'tombstone_compaction_interval', 'tombstone_threshold',
-                                     'enabled', 'unchecked_tombstone_compaction',
-                                     'only_purge_repaired_tombstones', 'provide_overlapping_tombstones'])
-        self.trycompletions(prefix + " new_table (col_a int PRIMARY KEY) WITH compaction = "
-                            + "{'class': 'UnifiedCompactionStrategy', '",
-                            choices=['scaling_parameters', 'min_sstable_size',
-                                     'flush_size_override', 'base_shard_count', 'class', 'target_sstable_size',
-                                     'sstable_growth', 'max_sstables_to_compact',
-                                     'enabled', 'expired_sstable_check_frequency_seconds',
-                                     'unsafe_aggressive_sstable_expiration', 'overlap_inclusion_method',
-                                     'tombstone_threshold', 'tombstone_compaction_interval',
-                                     'unchecked_tombstone_compaction', 'provide_overlapping_tombstones',
-                                     'max_threshold', 'only_purge_repaired_tombstones'])
-
+        self.trycompletions_chain([
+            ('compaction ', dict(immediate="= {'class': '")),
+            (comp,
+             dict(choices=['SizeTieredCompactionStrategy',
+                           'LeveledCompactionStrategy',
+                           'TimeWindowCompactionStrategy',
+                           'UnifiedCompactionStrategy'])),
+            (comp + 'S', dict(immediate="izeTieredCompactionStrategy'")),
+            (comp + 'SizeTieredCompactionStrategy', dict(immediate="'")),
+            (stcs, dict(choices=['}', ','])),
+            (stcs + ', ', dict(immediate="'")),
+            (stcs + ", '", dict(choices=_STCS_OPTS_TRIE)),
+            (stcs + '}', dict(choices=[';', 'AND'])),
+            (stcs + '} AND ', dict(choices=_WITH_OPTS_TRIE)),
+            (comp + "TimeWindowCompactionStrategy', '", dict(choices=_TWCS_OPTS_TRIE)),
+            (comp + "UnifiedCompactionStrategy', '", dict(choices=_UCS_OPTS_TRIE)),
+        ], prefix=with_opts)
+
+    @lists_all_keyspaces
     def test_complete_in_create_columnfamily(self):
         self.trycompletions('CREATE C', choices=['COLUMNFAMILY', 'CUSTOM'])
         self.trycompletions('CREATE CO', immediate='LUMNFAMILY ')
@@ -775,114 +798,52 @@ class TestCqlshCompletion(CqlshCompletionCase):
         self.trycompletions('CREATE MATERIALIZED VIEW AS SELECT * FROM system.peers WHERE host_id IS NOT NULL PRIMARY KEY (a, b) ', choices=[';', 'WITH'])
         self.trycompletions('CREATE MATERIALIZED VIEW AS SELECT * FROM system.peers WHERE host_id IS NOT NULL PRIMARY KEY ((a,b), c) ', choices=[';', 'WITH'])
 
+    @lists_all_keyspaces
     def test_complete_in_create_table(self):
         self.trycompletions('CREATE T', choices=['TRIGGER', 'TABLE', 'TYPE'])
         self.trycompletions('CREATE TA', immediate='BLE ')
         self.create_columnfamily_table_template('TABLE')
 
     def test_complete_in_describe(self):  # Cassandra-10733
-        self.trycompletions('DES', immediate='C')
-        # quoted_keyspace = '"' + self.cqlsh.keyspace + '"'
-        self.trycompletions('DESCR', immediate='IBE ')
-        self.trycompletions('DESC TABLE ',
-                            choices=['twenty_rows_table',
-                                     'ascii_with_special_chars', 'users',
-                                     'has_all_types', 'system.',
-                                     'empty_composite_table', 'empty_table',
-                                     'system_auth.', 'undefined_values_table',
-                                     'dynamic_columns',
-                                     'twenty_rows_composite_table',
-                                     'utf8_with_special_chars',
-                                     'system_traces.', 'songs',
-                                     'system_distributed.',
-                                     self.cqlsh.keyspace + '.'],
-                            other_choices_ok=True)
-
-        self.trycompletions('DESC TYPE ',
-                            choices=['system.',
-                                     'system_auth.',
-                                     'system_traces.',
-                                     'system_distributed.',
-                                     'address',
-                                     'phone_number',
-                                     'band_info_type',
-                                     'tags'],
-                            other_choices_ok=True)
-
-        self.trycompletions('DESC FUNCTION ',
-                            choices=['system.',
-                                     'system_auth.',
-                                     'system_traces.',
-                                     'system_distributed.',
-                                     'fbestband',
-                                     'fbestsong',
-                                     'fmax',
-                                     'fmin',
-                                     self.cqlsh.keyspace + '.'],
-                            other_choices_ok=True)
-
-        self.trycompletions('DESC AGGREGATE ',
-                            choices=['system.',
-                                     'system_auth.',
-                                     'system_traces.',
-                                     'system_distributed.',
-                                     'aggmin',
-                                     'aggmax',
-                                     self.cqlsh.keyspace + '.'],
-                            other_choices_ok=True)
-
-        # Unfortunately these commented tests will not work. This is due to the keyspace name containing quotes;
-        # cqlsh auto-completes a DESC differently when the keyspace contains quotes. I'll leave the
-        # test here though in case we ever change this script to test using keyspace names without
-        # quotes
-
-        # self.trycompletions('DESC TABLE ' + '"' + self.cqlsh.keyspace + '"', immediate='.')
-
-        self.trycompletions('DESC TABLE ' + '"' + self.cqlsh.keyspace + '".',
-                            choices=['twenty_rows_table',
-                                     'ascii_with_special_chars',
-                                     'users',
-                                     'has_all_types',
-                                     'empty_composite_table',
-                                     'empty_table',
-                                     'undefined_values_table',
-                                     'dynamic_columns',
-                                     'twenty_rows_composite_table',
-                                     'utf8_with_special_chars',
-                                     'songs'],
-                            other_choices_ok=True)
-
-        # See comment above for DESC TABLE
-        # self.trycompletions('DESC TYPE ' + '"' + self.cqlsh.keyspace + '"', immediate='.')
-
-        self.trycompletions('DESC TYPE ' + '"' + self.cqlsh.keyspace + '".',
-                            choices=['address',
-                                     'phone_number',
-                                     'band_info_type',
-                                     'tags'],
-                            other_choices_ok=True)
-
-        # See comment above for DESC TABLE
-        # self.trycompletions('DESC FUNCTION ' + '"' + self.cqlsh.keyspace + '"', immediate='.f')
-
-        self.trycompletions('DESC FUNCTION ' + '"' + self.cqlsh.keyspace + '".', immediate='f')
-
-        self.trycompletions('DESC FUNCTION ' + '"' + self.cqlsh.keyspace + '".f',
-                            choices=['fbestband',
-                                     'fbestsong',
-                                     'fmax',
-                                     'fmin'],
-                            other_choices_ok=True)
-
-        # See comment above for DESC TABLE
-        # self.trycompletions('DESC AGGREGATE ' + '"' + self.cqlsh.keyspace + '"', immediate='.aggm')
-
-        self.trycompletions('DESC AGGREGATE ' + '"' + self.cqlsh.keyspace + '".', immediate='aggm')
-
-        self.trycompletions('DESC AGGREGATE ' + '"' + self.cqlsh.keyspace + '".aggm',
-                            choices=['aggmin',
-                                     'aggmax'],
-                            other_choices_ok=True)
+        keyspace_choice = self.cqlsh.keyspace + '.'
+        quoted_keyspace = '"' + self.cqlsh.keyspace + '".'
+        self.trycompletions_chain([
+            ('DES', dict(immediate='C')),
+            ('DESCR', dict(immediate='IBE ')),
+            ('DESC TABLE ',
+             dict(choices=self._USER_TABLES | self._SYSTEM_KEYSPACE_CHOICES | {keyspace_choice},
+                  other_choices_ok=True)),
+            ('DESC TYPE ',
+             dict(choices=self._USER_TYPES | self._SYSTEM_KEYSPACE_CHOICES, other_choices_ok=True)),
+            ('DESC FUNCTION ',
+             dict(choices=self._USER_FUNCTIONS | self._SYSTEM_KEYSPACE_CHOICES | {keyspace_choice},
+                  other_choices_ok=True)),
+            ('DESC AGGREGATE ',
+             dict(choices=self._USER_AGGREGATES | self._SYSTEM_KEYSPACE_CHOICES | {keyspace_choice},
+                  other_choices_ok=True)),
+
+            # Unfortunately these commented tests will not work. This is due to the keyspace name containing quotes;
+            # cqlsh auto-completes a DESC differently when the keyspace contains quotes. I'll leave the
+            # test here though in case we ever change this script to test using keyspace names without
+            # quotes
+
+            # ('DESC TABLE "' + self.cqlsh.keyspace + '"', dict(immediate='.')),
+            ('DESC TABLE ' + quoted_keyspace, dict(choices=self._USER_TABLES, other_choices_ok=True)),
+
+            # See comment above for DESC TABLE
+            # ('DESC TYPE "' + self.cqlsh.keyspace + '"', dict(immediate='.')),
+            ('DESC TYPE ' + quoted_keyspace, dict(choices=self._USER_TYPES, other_choices_ok=True)),
+
+            # See comment above for DESC TABLE
+            # ('DESC FUNCTION "' + self.cqlsh.keyspace + '"', dict(immediate='.f')),
+            ('DESC FUNCTION ' + quoted_keyspace, dict(immediate='f')),
+            ('DESC FUNCTION ' + quoted_keyspace + 'f', dict(choices=self._USER_FUNCTIONS, other_choices_ok=True)),
+
+            # See comment above for DESC TABLE
+            # ('DESC AGGREGATE "' + self.cqlsh.keyspace + '"', dict(immediate='.aggm')),
+            ('DESC AGGREGATE ' + quoted_keyspace, dict(immediate='aggm')),
+            ('DESC AGGREGATE ' + quoted_keyspace + 'aggm', dict(choices=self._USER_AGGREGATES, other_choices_ok=True)),
+        ])
 
     def test_complete_in_drop_table(self):
         self.trycompletions('DROP T', choices=['TABLE', 'TRIGGER', 'TYPE'])
@@ -893,6 +854,7 @@ class TestCqlshCompletion(CqlshCompletionCase):
         self.trycompletions('TRU', immediate='NCATE ')
         self.trycompletions('TRUNCATE T', choices=['TABLE', 'twenty_rows_composite_table', 'twenty_rows_table'])
 
+    @lists_all_keyspaces
     def test_complete_in_use(self):
         self.trycompletions('US', immediate='E ')
         self.trycompletions('USE ', choices=[self.cqlsh.keyspace, 'system', 'system_auth', 'system_metrics',
@@ -907,6 +869,7 @@ class TestCqlshCompletion(CqlshCompletionCase):
     def test_complete_in_drop_index(self):
         self.trycompletions('DROP I', immediate='NDEX ')
 
+    @lists_all_keyspaces
     def test_complete_in_alter_keyspace(self):
         self.trycompletions('ALTER KEY', 'SPACE ')
         self.trycompletions('ALTER KEYSPACE ', '', choices=[self.cqlsh.keyspace, 'system_auth',
@@ -917,69 +880,12 @@ class TestCqlshCompletion(CqlshCompletionCase):
                             choices=['NetworkTopologyStrategy', 'SimpleStrategy'])
 
     def test_complete_in_grant(self):
-        self.trycompletions("GR",
-                            immediate='ANT ')
-        self.trycompletions("GRANT ",
-                            choices=['ALL', 'ALTER', 'AUTHORIZE', 'CREATE', 'DESCRIBE', 'DROP', 'EXECUTE', 'MODIFY', 'SELECT', 'UNMASK', 'SELECT_MASKED'],
-                            other_choices_ok=True)
-        self.trycompletions("GRANT MODIFY ",
-                            choices=[',', 'ON', 'PERMISSION'])
-        self.trycompletions("GRANT MODIFY P",
-                            immediate='ERMISSION ')
-        self.trycompletions("GRANT MODIFY PERMISSION ",
-                            choices=[',', 'ON'])
-        self.trycompletions("GRANT MODIFY PERMISSION, ",
-                            choices=['ALTER', 'AUTHORIZE', 'CREATE', 'DESCRIBE', 'DROP', 'EXECUTE', 'SELECT', 'UNMASK', 'SELECT_MASKED'])
-        self.trycompletions("GRANT MODIFY PERMISSION, D",
-                            choices=['DESCRIBE', 'DROP'])
-        self.trycompletions("GRANT MODIFY PERMISSION, DR",
-                            immediate='OP ')
-        self.trycompletions("GRANT MODIFY PERMISSION, DROP O",
-                            immediate='N ')
-        self.trycompletions("GRANT MODIFY, DROP ON ",
-                            choices=['ALL', 'KEYSPACE', 'MBEANS', 'ROLE', 'FUNCTION', 'MBEAN', 'TABLE'],
-                            other_choices_ok=True)
-        self.trycompletions("GRANT MODIFY, DROP ON ALL ",
-                            choices=['KEYSPACES', 'TABLES'],
-                            other_choices_ok=True)
-        self.trycompletions("GRANT MODIFY PERMISSION ON KEY",
-                            immediate='SPACE ')
-        self.trycompletions("GRANT MODIFY PERMISSION ON KEYSPACE system_tr",
-                            immediate='aces TO ')
+        self.trycompletions_chain(self._GRANT_CASES)
 
     def test_complete_in_revoke(self):
-        self.trycompletions("RE",
-                            immediate='VOKE ')
-        self.trycompletions("REVOKE ",
-                            choices=['ALL', 'ALTER', 'AUTHORIZE', 'CREATE', 'DESCRIBE', 'DROP', 'EXECUTE', 'MODIFY', 'SELECT', 'UNMASK', 'SELECT_MASKED'],
-                            other_choices_ok=True)
-        self.trycompletions("REVOKE MODIFY ",
-                            choices=[',', 'ON', 'PERMISSION'])
-        self.trycompletions("REVOKE MODIFY P",
-                            immediate='ERMISSION ')
-        self.trycompletions("REVOKE MODIFY PERMISSION ",
-                            choices=[',', 'ON'])
-        self.trycompletions("REVOKE MODIFY PERMISSION, ",
-                            choices=['ALTER', 'AUTHORIZE', 'CREATE', 'DESCRIBE', 'DROP', 'EXECUTE', 'SELECT', 'UNMASK', 'SELECT_MASKED'])
-        self.trycompletions("REVOKE MODIFY PERMISSION, D",
-                            choices=['DESCRIBE', 'DROP'])
-        self.trycompletions("REVOKE MODIFY PERMISSION, DR",
-                            immediate='OP ')
-        self.trycompletions("REVOKE MODIFY PERMISSION, DROP ",
-                            choices=[',', 'ON', 'PERMISSION'])
-        self.trycompletions("REVOKE MODIFY PERMISSION, DROP O",
-                            immediate='N ')
-        self.trycompletions("REVOKE MODIFY PERMISSION, DROP ON ",
-                            choices=['ALL', 'KEYSPACE', 'MBEANS', 'ROLE', 'FUNCTION', 'MBEAN', 'TABLE'],
-                            other_choices_ok=True)
-        self.trycompletions("REVOKE MODIFY, DROP ON ALL ",
-                            choices=['KEYSPACES', 'TABLES'],
-                            other_choices_ok=True)
-        self.trycompletions("REVOKE MODIFY PERMISSION, DROP ON KEY",
-                            immediate='SPACE ')
-        self.trycompletions("REVOKE MODIFY PERMISSION, DROP ON KEYSPACE system_tr",
-                            immediate='aces FROM ')
+        self.trycompletions_chain(self._REVOKE_CASES)
 
+    @lists_all_keyspaces
     def test_complete_in_alter_table(self):
         self.trycompletions('ALTER TABLE I', immediate='F EXISTS ')
         self.trycompletions('ALTER TABLE IF', immediate=' EXISTS ')
@@ -1017,6 +923,7 @@ class TestCqlshCompletion(CqlshCompletionCase):
         self.trycompletions('ALTER TABLE IF EXISTS new_table ALTER IF EXISTS col D', immediate='ROP MASKED ;')
         self.trycompletions('ALTER TABLE IF EXISTS new_table ALTER IF EXISTS col DROP M', immediate='ASKED ;')
 
+    @lists_all_keyspaces
     def test_complete_in_alter_type(self):
         self.trycompletions('ALTER TYPE I', immediate='F EXISTS ')
         self.trycompletions('ALTER TYPE ', choices=['IF', 'system_views.',